@@ -28,120 +28,154 @@
 #
 # Modified to ignore non-TAP input and handle YAML diagnostics
 # Copyright 2024, Eden Ross Duff, MSc
+import logging
+import re
 import sys
+import textwrap
+from functools import cached_property
+from operator import attrgetter
+from typing import Generator
+from typing import Iterable
 from typing import Mapping
 from typing import TypeAlias
 
 import yaml
-from pyparsing import CaselessLiteral
-from pyparsing import FollowedBy
-from pyparsing import Group
-from pyparsing import LineEnd
-from pyparsing import Literal
-from pyparsing import OneOrMore
-from pyparsing import Optional
-from pyparsing import ParserElement
-from pyparsing import ParseResults
-from pyparsing import Regex
-from pyparsing import SkipTo
-from pyparsing import Suppress
-from pyparsing import White
-from pyparsing import Word
-from pyparsing import ZeroOrMore
-from pyparsing import empty
-from pyparsing import nums
-from pyparsing import rest_of_line
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader  # type: ignore
 
 if sys.version_info >= (3, 11):  # pragma: no cover
     from typing import Self  # noqa: TC002
 elif sys.version_info < (3, 11):  # pragma: no cover
     from typing_extensions import Self  # noqa: TC002
 
-__all__ = ['tap_document', 'TAPTest', 'TAPSummary']
+__all__ = ['parse_tap', 'parse_tap_stream', 'tap_document', 'TAPTest', 'TAPSummary']
+
+logger = logging.getLogger(__name__)
 
 Diagnostics: TypeAlias = Mapping[
     int | str, str | list[Mapping[int | str, str]] | Mapping[int | str, str]
 ]
-# newlines are significant whitespace, so set default skippable
-# whitespace to just spaces and tabs
-ParserElement.set_default_whitespace_chars(' \t')
-NL = LineEnd().suppress()  # type: ignore
-INDENT4 = OneOrMore(White(' ', exact=4))
-INDENT3 = Suppress(OneOrMore(White(' ', exact=3)))
-integer = Word(nums)
-plan = '1..' + integer('ubound')
-
-OK, NOT_OK = map(Literal, ['ok', 'not ok'])
-test_status = OK | NOT_OK
-
-description = Regex('[^#\n]+')
-description.set_parse_action(lambda t: t[0].lstrip('- '))  # pyright: ignore
-
-TODO, SKIP = map(CaselessLiteral, 'TODO SKIP'.split())  # noqa: T101
-directive = Group(
-    Suppress('#')
-    + (
-        TODO + rest_of_line  # noqa: T101
-        | FollowedBy(SKIP) + rest_of_line.copy().set_parse_action(lambda t: ['SKIP', t[0]])
-    ),
-)
-comment_line = Suppress('#' + White(' ')) + rest_of_line
-version = Suppress('TAP version') + Word(nums[1:], nums, as_keyword=True)
-yaml_end = Suppress('...')
-test_line = Group(
-    ZeroOrMore(White(' ', exact=4).leave_whitespace()).set_parse_action(
-        lambda t: len(t.as_list())
-    )('subtest_level')
-    + test_status('passed')
-    + Optional(integer)('test_number')
-    + Optional(description)('description')
-    + Optional(directive)('directive')
-    + Optional(
-        NL
-        + Group(
-            Suppress('---')
-            + SkipTo(yaml_end).set_parse_action(
-                lambda t: yaml.safe_load(t[0])  # pyright: ignore
-            )
-            + yaml_end,
-        )('yaml').set_parse_action(lambda t: t.as_dict()),
-    )
-)
 
-bail_line = Group(
-    CaselessLiteral('Bail out!')('BAIL') + empty + Optional(rest_of_line)('reason')
-)
-comment = Optional(comment_line)('comments')
-anything = Suppress(SkipTo(NL))
-tap_document = Optional(
-    Group(Suppress(SkipTo(version)) + version)('version') + NL
-) + Optional(
-    Group(plan)('plan') + NL,
-) & Group(
-    OneOrMore((test_line | bail_line | anything | comment) + NL)
-)(
-    'tests',
+# 'not' if failing, test number, description, directive kind, directive text
+_TEST_RE = re.compile(
+    r'^(?:ok|(not) ok)(?:\s+(\d+))?(?:\s+-?\s*([^#\n]*?))?'
+    r'(?:\s*#\s*(?:((?i:TODO|SKIP))\S*)?\s*(.*))?$',  # noqa: T101
+    re.ASCII,
 )
+# TAPTest.flags bits
+_PASSED, _SKIPPED, _TODO = 1, 2, 4
+# only lines starting with a status are worth matching against _TEST_RE
+_TEST_PREFIXES = ('ok', 'not ok')
 
 
 class TAPTest:
     """A single TAP test point."""
 
-    def __init__(self: Self, results: ParseResults) -> None:
+    __slots__ = (
+        '_yaml',
+        '_yaml_raw',
+        'description',
+        'flags',
+        'num',
+        'subtest_level',
+    )
+
+    def __init__(
+        self: Self,
+        num: int | None = None,
+        description: str | None = None,
+        passed: bool = False,
+        skipped: bool = False,
+        todo: bool = False,
+        yaml_raw: str | None = None,
+        subtest_level: int = 0,
+    ) -> None:
         """Create a test point.
 
-        :param results: parsed TAP stream
-        :type results: ParseResults
+        :param num: the test number, if given
+        :type num: int | None
+        :param description: the test description, if given
+        :type description: str | None
+        :param passed: the test status was ``ok``
+        :type passed: bool
+        :param skipped: the test has a SKIP directive
+        :type skipped: bool
+        :param todo: the test has a to-do directive
+        :type todo: bool
+        :param yaml_raw: unparsed YAML diagnostics block, if any
+        :type yaml_raw: str | None
+        :param subtest_level: nesting depth of the test point
+        :type subtest_level: int
         """
-        self.subtest_level = results.subtest_level
-        self.num = results.test_number
-        self.description = results.description if results.description else None
-        self.passed = results.passed == 'ok'
-        self.skipped = self.todo = False
-        if results.directive:
-            self.skipped = results.directive[0][0] == 'SKIP'
-            self.todo = results.directive[0][0] == 'TODO'  # noqa: T101
-        self.yaml = results.yaml['yaml'] if results.yaml else {}  # pyright: ignore
+        self.subtest_level = subtest_level
+        self.num = num
+        self.description = description
+        self.flags = passed * _PASSED | skipped * _SKIPPED | todo * _TODO
+        self._yaml_raw = yaml_raw
+        self._yaml: Diagnostics | None = None
+
+    @property
+    def passed(self: Self) -> bool:
+        """The test status was ``ok``."""
+        return bool(self.flags & _PASSED)
+
+    @property
+    def skipped(self: Self) -> bool:
+        """The test has a SKIP directive."""
+        return bool(self.flags & _SKIPPED)
+
+    @property
+    def todo(self: Self) -> bool:
+        """The test has a TODO directive."""  # noqa: T101
+        return bool(self.flags & _TODO)
+
+    @property
+    def yaml(self: Self) -> Diagnostics:
+        """YAML diagnostics attached to the test point, loaded on first access."""
+        if self._yaml is None:
+            raw = self._yaml_raw
+            if not raw or raw.isspace():
+                self._yaml = {}
+            else:
+                self._yaml = yaml.load(textwrap.dedent(raw), Loader=SafeLoader) or {}
+        return self._yaml
+
+    @classmethod
+    def from_match(
+        cls: type[Self],
+        passed: bool,
+        num: str | None,
+        description: str | None,
+        directive: str | None,
+        subtest_level: int = 0,
+    ) -> 'TAPTest':
+        """Create a test point from the groups of a matched test line.
+
+        :param passed: the test status was ``ok``
+        :type passed: bool
+        :param num: the test number text, if given
+        :type num: str | None
+        :param description: the test description text, if given
+        :type description: str | None
+        :param directive: the directive keyword, if given
+        :type directive: str | None
+        :param subtest_level: nesting depth of the test point
+        :type subtest_level: int
+        :return: a TAPTest object
+        :rtype: TAPTest
+        """
+        kind = directive.upper() if directive else None
+        return TAPTest(
+            int(num) if num else None,
+            description.rstrip() if description else None,
+            passed,
+            kind == 'SKIP',
+            kind == 'TODO',  # noqa: T101
+            subtest_level=subtest_level,
+        )
 
     @classmethod
     def bailed_test(cls: type[Self], num: int) -> 'TAPTest':
@@ -152,20 +186,29 @@ class TAPTest:
         :return: a bailed TAPTest object
         :rtype: TAPTest
         """
-        ret = TAPTest(empty.parse_string(''))
-        ret.num = num
-        ret.skipped = True
-        return ret
+        return TAPTest(num, skipped=True)
 
 
 class TAPSummary:
     """Summarize a parsed TAP stream."""
 
-    def __init__(self: Self, results: ParseResults) -> None:  # noqa: C901
+    def __init__(  # noqa: C901
+        self: Self,
+        tests: list[TAPTest],
+        version: int = 12,
+        plan: int | None = None,
+        bail_reason: str | None = None,
+    ) -> None:
         """Initialize with parsed TAP data.
 
-        :param results: A parsed TAP stream
-        :type results: ParseResults
+        :param tests: test points in stream order, including subtests
+        :type tests: list[TAPTest]
+        :param version: the TAP version, defaults to 12
+        :type version: int
+        :param plan: the upper bound of the test plan, if given
+        :type plan: int | None
+        :param bail_reason: the reason given by a ``Bail out!`` line, if any
+        :type bail_reason: str | None
         """
         self.passed_tests: list[TAPTest] = []
         self.subtests: list[TAPTest] = []
@@ -173,53 +216,72 @@ class TAPSummary:
         self.skipped_tests: list[TAPTest] = []
         self.todo_tests: list[TAPTest] = []
         self.bonus_tests: list[TAPTest] = []
-        self.yaml_diagnostics: Diagnostics = {}
-        self.bail = False
-        self.version = results.version[0] if results.version else 12
-        if results.plan:
-            expected = list(range(1, int(results.plan.ubound) + 1))  # pyright: ignore
+        self._failed_not_todo = 0
+        self._yaml_tests: list[TAPTest] = []
+        self.bail = bail_reason is not None
+        self.version = version
+        if plan is not None:
+            expected = range(1, plan + 1)
         else:
-            expected = list(range(1, len(results.tests) + 1))
+            expected = range(1, len(tests) + 1)
         subtestnum = 0
-        for i, res in enumerate(results.tests):
-            # test for bail out
-            if hasattr(res, 'BAIL') and res.BAIL:  # pyright: ignore
-                # ~ print "Test suite aborted: " + res.reason
-                # ~ self.failed_tests += expected[i:]
-                self.bail = True
-                self.skipped_tests += [TAPTest.bailed_test(ii) for ii in expected[i:]]
-                self.bail_reason = res.reason  # pyright: ignore
-                break
-
-            if res.subtest_level > 0:  # pyright: ignore
+        for i, test in enumerate(tests):
+            if test.subtest_level > 0:
                 subtestnum += 1
-                self.subtests.append(TAPTest(res))  # pyright: ignore
+                self.subtests.append(test)
                 continue
 
-            testnum = i + 1
-            if res.test_number != '':  # pragma: no cover  # pyright: ignore
-                if testnum - subtestnum != int(res.test_number):  # pyright: ignore
-                    print('ERROR! test %(test_number)s out of sequence' % res)
-                testnum = int(res.test_number)  # pyright: ignore
-            res['test_number'] = testnum  # pyright: ignore
-
-            test = TAPTest(res)  # pyright: ignore
-            if test.yaml:
-                self.yaml_diagnostics.update({testnum: test.yaml[0]})  # type: ignore
-            if test.passed:
+            testnum = test.num
+            if testnum is None:
+                testnum = test.num = i + 1
+            elif i + 1 - subtestnum != testnum:  # pragma: no cover
+                logger.warning('test %s out of sequence', testnum)
+
+            if test._yaml_raw is not None:  # noqa: SLF001
+                self._yaml_tests.append(test)
+            flags = test.flags
+            if flags & _PASSED:
                 self.passed_tests.append(test)
             else:
                 self.failed_tests.append(test)
-            if test.skipped:
+                if not flags & _TODO:
+                    self._failed_not_todo += 1
+            if flags & _SKIPPED:
                 self.skipped_tests.append(test)
-            if test.todo:
+            if flags & _TODO:
                 self.todo_tests.append(test)
-            if test.todo and test.passed:
-                self.bonus_tests.append(test)
+                if flags & _PASSED:
+                    self.bonus_tests.append(test)
 
-        self.passed_suite = not self.bail and (
-            set(self.failed_tests) - set(self.todo_tests) == set()
-        )
+        if bail_reason is not None:
+            self.skipped_tests += [TAPTest.bailed_test(ii) for ii in expected[len(tests) :]]
+            self.bail_reason = bail_reason
+
+        self.passed_suite = not self.bail and self._failed_not_todo == 0
+
+    @classmethod
+    def from_stream(cls: type[Self], lines: Iterable[str]) -> Self:
+        """Parse and summarize a TAP stream one line at a time.
+
+        :param lines: TAP stream lines, with or without line endings
+        :type lines: Iterable[str]
+        :return: the stream summary
+        :rtype: TAPSummary
+        """
+        header: tuple[int, int | None, str | None] = (12, None, None)
+
+        def stream() -> Generator[TAPTest, None, None]:
+            """Yield each test point and keep the stream header."""
+            nonlocal header
+            header = yield from parse_tap_stream(lines)
+
+        tests = list(stream())
+        return cls(tests, *header)
+
+    @cached_property
+    def yaml_diagnostics(self: Self) -> Diagnostics:
+        """YAML diagnostics of each top-level test point, keyed by test number."""
+        return {test.num: test.yaml for test in self._yaml_tests if test.yaml}  # type: ignore
 
     def summary(  # noqa: C901
         self: Self,
@@ -235,7 +297,8 @@ class TAPSummary:
         :return: a text summary of a TAP stream
         :rtype: str
         """
-        test_list_str = lambda tl: '[' + ','.join(str(t.num) for t in tl) + ']'  # noqa: E731
+        num = attrgetter('num')
+        test_list_str = lambda tl: '[' + ','.join(map(str, map(num, tl))) + ']'  # noqa: E731
         summary_text = []
         if show_passed or show_all:
             summary_text.append(f'PASSED: {test_list_str(self.passed_tests)}')  # type: ignore
@@ -274,7 +337,101 @@ class TAPSummary:
         return '\n'.join(summary_text)
 
 
-tap_document.set_parse_action(TAPSummary)
+class _TAPDocument:
+    """Stand-in for the former pyparsing ``tap_document`` grammar."""
+
+    def parse_string(self: Self, instring: str) -> list[TAPSummary]:
+        """Parse a TAP stream.
+
+        :param instring: TAP stream text
+        :type instring: str
+        :return: a single element list holding the stream summary
+        :rtype: list[TAPSummary]
+        """
+        return [TAPSummary.from_stream(instring.split('\n'))]
+
+
+tap_document = _TAPDocument()
+
+
+def parse_tap_stream(  # noqa: C901
+    lines: Iterable[str],
+) -> Generator[TAPTest, None, tuple[int, int | None, str | None]]:
+    """Parse a TAP stream one line at a time.
+
+    Lines that are not TAP are ignored. Each test point is yielded once
+    the YAML diagnostics block following it, if any, has been read. A
+    block left open is dropped at the first line indented no deeper than
+    its test point, and that line is parsed as TAP.
+
+    :param lines: TAP stream lines, with or without line endings
+    :type lines: Iterable[str]
+    :yield: each test point, including subtests, in stream order
+    :return: the TAP version, plan upper bound and bail out reason
+    :rtype: Generator[TAPTest, None, tuple[int, int | None, str | None]]
+    """
+    version = 12
+    plan = None
+    # a test point is held back until it is known whether a YAML block follows
+    pending: TAPTest | None = None
+    pending_indent = 0
+    yaml_lines: list[str] | None = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        body = line.lstrip()
+        indent = len(line) - len(body)
+        if yaml_lines is not None:
+            closed = body.rstrip() == '...'
+            if not closed and (not body or indent > pending_indent):
+                yaml_lines.append(line)
+                continue
+            if closed:
+                pending._yaml_raw = '\n'.join(yaml_lines)  # type: ignore  # noqa: SLF001
+            yield pending  # type: ignore
+            pending = yaml_lines = None
+            if closed:
+                continue
+            # the block was never closed, so this line is TAP again
+        elif pending is not None:
+            if body.startswith('---'):
+                yaml_lines = []
+                continue
+            yield pending
+            pending = None
+        match = _TEST_RE.match(body) if body.startswith(_TEST_PREFIXES) else None
+        if match is not None:
+            failed, num, description, directive, _ = match.groups()
+            pending = TAPTest.from_match(
+                failed is None, num, description, directive, indent // 4
+            )
+            pending_indent = indent
+        elif line.startswith('1..'):
+            ubound = line[3:].split('#', 1)[0].strip()
+            if ubound.isascii() and ubound.isdigit():
+                plan = int(ubound)
+        elif body[:9].lower() == 'bail out!':
+            return version, plan, body[9:].strip()
+        elif body.startswith('TAP version '):
+            number = body[12:].strip()
+            if number.isascii() and number.isdigit():
+                version = int(number)
+    if pending is not None:
+        yield pending
+    return version, plan, None
+
+
+def parse_tap(text: str) -> TAPSummary:
+    """Parse a TAP stream line by line.
+
+    Lines that are not TAP are ignored.
+
+    :param text: TAP stream text
+    :type text: str
+    :return: the stream summary
+    :rtype: TAPSummary
+    """
+    return TAPSummary.from_stream(text.split('\n'))
+
 
 if __name__ == '__main__':
     test1 = """\
@@ -388,6 +545,5 @@ not ok 2 - bar.tap
 
     for test in (test1, test2, test3, test4, test5, test6, test7):
         print(test)
-        tapResult = tap_document.parse_string(test)[0]
-        print(tapResult.summary(show_all=True))  # pyright: ignore
+        print(parse_tap(test).summary(show_all=True))
         print()
@@ -25,32 +25,85 @@
 # CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT,
 # TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
 # SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+from typing import Generator
+from typing import Iterable
 from typing import Mapping
 from typing import TypeAlias
 
-from pyparsing import ParserElement
-from pyparsing import ParseResults
-
-__all__ = ['tap_document', 'TAPTest', 'TAPSummary']
+__all__ = ['parse_tap', 'parse_tap_stream', 'tap_document', 'TAPTest', 'TAPSummary']
 
 Diagnostics: TypeAlias = Mapping[
     int | str, str | list[Mapping[int | str, str]] | Mapping[int | str, str]
 ]
-tap_document: ParserElement
 
 class TAPTest:
     """A single TAP test point."""
-    num: int
+    subtest_level: int
+    num: int | None
     description: str | None
-    passed: str
-    skipped: bool
-    todo: bool
-    yaml: Diagnostics
-    def __init__(self, results: ParseResults) -> None:
+    flags: int
+    @property
+    def passed(self) -> bool:
+        """The test status was ``ok``."""
+    @property
+    def skipped(self) -> bool:
+        """The test has a SKIP directive."""
+    @property
+    def todo(self) -> bool:
+        """The test has a TODO directive."""
+    @property
+    def yaml(self) -> Diagnostics:
+        """YAML diagnostics attached to the test point, loaded on first access."""
+    def __init__(
+        self,
+        num: int | None = None,
+        description: str | None = None,
+        passed: bool = False,
+        skipped: bool = False,
+        todo: bool = False,
+        yaml_raw: str | None = None,
+        subtest_level: int = 0,
+    ) -> None:
         """Create a test point.
 
-        :param results: parsed TAP stream
-        :type results: ParseResults
+        :param num: the test number, if given
+        :type num: int | None
+        :param description: the test description, if given
+        :type description: str | None
+        :param passed: the test status was ``ok``
+        :type passed: bool
+        :param skipped: the test has a SKIP directive
+        :type skipped: bool
+        :param todo: the test has a to-do directive
+        :type todo: bool
+        :param yaml_raw: unparsed YAML diagnostics block, if any
+        :type yaml_raw: str | None
+        :param subtest_level: nesting depth of the test point
+        :type subtest_level: int
+        """
+    @classmethod
+    def from_match(
+        cls,
+        passed: bool,
+        num: str | None,
+        description: str | None,
+        directive: str | None,
+        subtest_level: int = 0,
+    ) -> TAPTest:
+        """Create a test point from the groups of a matched test line.
+
+        :param passed: the test status was ``ok``
+        :type passed: bool
+        :param num: the test number text, if given
+        :type num: str | None
+        :param description: the test description text, if given
+        :type description: str | None
+        :param directive: the directive keyword, if given
+        :type directive: str | None
+        :param subtest_level: nesting depth of the test point
+        :type subtest_level: int
+        :return: a TAPTest object
+        :rtype: TAPTest
         """
     @classmethod
     def bailed_test(cls, num: int) -> TAPTest:
@@ -65,20 +118,44 @@ class TAPTest:
 class TAPSummary:
     """Summarize a parsed TAP stream."""
     passed_tests: list[TAPTest]
+    subtests: list[TAPTest]
     failed_tests: list[TAPTest]
     skipped_tests: list[TAPTest]
     todo_tests: list[TAPTest]
     bonus_tests: list[TAPTest]
-    yaml_diagnostics: Diagnostics
     bail: bool
     version: int
     bail_reason: str
     passed_suite: bool
-    def __init__(self, results: ParseResults) -> None:
+    @classmethod
+    def from_stream(cls, lines: Iterable[str]) -> TAPSummary:
+        """Parse and summarize a TAP stream one line at a time.
+
+        :param lines: TAP stream lines, with or without line endings
+        :type lines: Iterable[str]
+        :return: the stream summary
+        :rtype: TAPSummary
+        """
+    @property
+    def yaml_diagnostics(self) -> Diagnostics:
+        """YAML diagnostics of each top-level test point, keyed by test number."""
+    def __init__(
+        self,
+        tests: list[TAPTest],
+        version: int = 12,
+        plan: int | None = None,
+        bail_reason: str | None = None,
+    ) -> None:
         """Initialize with parsed TAP data.
 
-        :param results: A parsed TAP stream
-        :type results: ParseResults
+        :param tests: test points in stream order, including subtests
+        :type tests: list[TAPTest]
+        :param version: the TAP version, defaults to 12
+        :type version: int
+        :param plan: the upper bound of the test plan, if given
+        :type plan: int | None
+        :param bail_reason: the reason given by a ``Bail out!`` line, if any
+        :type bail_reason: str | None
         """
     def summary(self, show_passed: bool = False, show_all: bool = False) -> str:
         """Get the summary of a TAP stream.
@@ -90,3 +167,44 @@ class TAPSummary:
         :return: a text summary of a TAP stream
         :rtype: str
         """
+
+class _TAPDocument:
+    """Stand-in for the former pyparsing ``tap_document`` grammar."""
+    def parse_string(self, instring: str) -> list[TAPSummary]:
+        """Parse a TAP stream.
+
+        :param instring: TAP stream text
+        :type instring: str
+        :return: a single element list holding the stream summary
+        :rtype: list[TAPSummary]
+        """
+
+tap_document: _TAPDocument
+
+def parse_tap_stream(
+    lines: Iterable[str],
+) -> Generator[TAPTest, None, tuple[int, int | None, str | None]]:
+    """Parse a TAP stream one line at a time.
+
+    Lines that are not TAP are ignored. Each test point is yielded once
+    the YAML diagnostics block following it, if any, has been read. A
+    block left open is dropped at the first line indented no deeper than
+    its test point, and that line is parsed as TAP.
+
+    :param lines: TAP stream lines, with or without line endings
+    :type lines: Iterable[str]
+    :yield: each test point, including subtests, in stream order
+    :return: the TAP version, plan upper bound and bail out reason
+    :rtype: Generator[TAPTest, None, tuple[int, int | None, str | None]]
+    """
+
+def parse_tap(text: str) -> TAPSummary:
+    """Parse a TAP stream line by line.
+
+    Lines that are not TAP are ignored.
+
+    :param text: TAP stream text
+    :type text: str
+    :return: the stream summary
+    :rtype: TAPSummary
+    """
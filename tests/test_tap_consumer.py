@@ -1,4 +1,9 @@
 # noqa: INP001
+import io
+
+from tap_consumer import TAPSummary
+from tap_consumer import parse_tap
+from tap_consumer import parse_tap_stream
 from tap_consumer import tap_document
 
 
@@ -117,3 +122,91 @@ not ok 2 - bar.tap
         tapResult = tap_document.parse_string(test)[0]
         print(tapResult.summary(show_all=True))  # pyright: ignore
         print()
+
+
+def test_parse_tap() -> None:
+    summary = parse_tap("""\
+TAP version 14
+1..3
+ok 1 - first
+not ok 2 - second # TODO not done
+   ---
+   found: false
+   ...
+    ok 1 - nested
+ok 3 # skip not here
+""")
+    assert summary.version == 14
+    assert [t.num for t in summary.passed_tests] == [1, 3]
+    assert [t.description for t in summary.failed_tests] == ['second']
+    assert summary.todo_tests == summary.failed_tests
+    assert [t.num for t in summary.skipped_tests] == [3]
+    assert len(summary.subtests) == 1
+    assert summary.yaml_diagnostics == {2: {'found': False}}
+    assert summary.passed_suite
+
+
+def test_from_stream() -> None:
+    stream = io.StringIO("""\
+1..3
+ok 1
+not ok 2
+  ---
+  wanted: 1
+  ...
+Bail out! stopped
+ok 3
+""")
+    summary = TAPSummary.from_stream(stream)
+    assert summary.bail
+    assert summary.bail_reason == 'stopped'
+    assert [t.num for t in summary.skipped_tests] == [3]
+    assert summary.yaml_diagnostics == {2: {'wanted': 1}}
+    assert not summary.passed_suite
+
+
+def test_non_directive_comment() -> None:
+    summary = parse_tap('not ok 1 - broken # see issue 12\n1..1\n')
+    assert [t.num for t in summary.failed_tests] == [1]
+    assert summary.failed_tests[0].description == 'broken'
+    assert not summary.failed_tests[0].passed
+    assert not summary.failed_tests[0].skipped
+    assert not summary.failed_tests[0].todo
+    assert not summary.passed_suite
+
+
+def test_unterminated_yaml() -> None:
+    summary = parse_tap('1..2\nok 1\n  ---\n  x: 1\nnot ok 2\n')
+    assert [t.num for t in summary.failed_tests] == [2]
+    assert summary.yaml_diagnostics == {}
+    assert not summary.passed_suite
+
+
+def test_malformed_lines() -> None:
+    summary = parse_tap("""\
+TAP version x
+TAP version \u00b2
+1..x
+1..\u00b2
+---
+ok 1
+  ---
+  ...
+""")
+    assert summary.version == 12
+    assert [t.num for t in summary.passed_tests] == [1]
+    assert summary.passed_tests[0].yaml == {}
+    assert summary.yaml_diagnostics == {}
+    assert summary.passed_suite
+
+
+def test_only_newline_ends_a_line() -> None:
+    summary = parse_tap('not ok 1 - a\x0cb\r\nok 2 - c d\n')
+    assert [t.description for t in summary.failed_tests] == ['a\x0cb']
+    assert [t.description for t in summary.passed_tests] == ['c d']
+
+
+def test_stream_yields_yaml() -> None:
+    lines = 'not ok 1\n  ---\n  wanted: 1\n  ...\nok 2\n  ---\n  x: 1\n'.split('\n')
+    seen = [(t.num, t.yaml) for t in parse_tap_stream(lines)]
+    assert seen == [(1, {'wanted': 1}), (2, {})]